@@ -1,24 +1,85 @@
 import sqlite3
-import pandas as pd
+import csv
 import os
+import sys
+
+BATCH_SIZE = 10_000
+
+def _read_header(csv_file):
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+def _col_defs(header):
+    # NUMERIC affinity makes SQLite coerce integer-looking text on insert,
+    # matching the types pandas' to_sql used to infer — without it, numeric
+    # comparisons like years_in_practice > N degrade to string compares
+    return ", ".join(f'"{col}" NUMERIC' for col in header)
+
+def _try_native_csv_load(conn, csv_file, table_name):
+    """Load via SQLite's C-level CSV virtual table when the extension is available."""
+    if not hasattr(conn, "enable_load_extension"):
+        return False
+    try:
+        conn.enable_load_extension(True)
+        try:
+            conn.load_extension("csv")
+        finally:
+            conn.enable_load_extension(False)
+        # The virtual table exposes every column as TEXT, so the target table
+        # is created with explicit affinities rather than CREATE TABLE AS
+        conn.executescript(f"""
+            DROP TABLE IF EXISTS {table_name};
+            CREATE VIRTUAL TABLE temp.csv_src USING csv(filename='{csv_file}', header=YES);
+            CREATE TABLE {table_name} ({_col_defs(_read_header(csv_file))});
+            INSERT INTO {table_name} SELECT * FROM temp.csv_src;
+            DROP TABLE temp.csv_src;
+        """)
+        return True
+    except sqlite3.Error:
+        return False
 
 def csv_to_sqlite(csv_file, db_file="roster.db", table_name="roster"):
     # Check if the CSV file exists
     if not os.path.exists(csv_file):
         raise FileNotFoundError(f"CSV file '{csv_file}' not found!")
 
-    # Load CSV into pandas DataFrame
-    df = pd.read_csv(csv_file)
-    
     # Connect to SQLite (creates file if it doesn’t exist)
     conn = sqlite3.connect(db_file)
     cursor = conn.cursor()
 
-    # Drop table if it already exists (optional, ensures fresh load)
-    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+    # Bulk-load friendly PRAGMAs: batch everything in one transaction
+    # instead of pandas' per-row insert/commit path
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-200000")
+
+    # Fastest path: let the CSV virtual table extension parse and insert
+    # entirely in C; fall back to batched executemany when unavailable
+    if _try_native_csv_load(conn, csv_file, table_name):
+        conn.commit()
+        conn.close()
+        print(f"✅ Data from '{csv_file}' has been loaded into '{db_file}' (table: {table_name})")
+        return
 
-    # Write DataFrame to SQLite
-    df.to_sql(table_name, conn, index=False, if_exists="replace")
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+
+        # Drop table if it already exists (optional, ensures fresh load)
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+        cursor.execute(f"CREATE TABLE {table_name} ({_col_defs(header)})")
+
+        insert_sql = f"INSERT INTO {table_name} VALUES ({', '.join('?' * len(header))})"
+        cursor.execute("BEGIN")
+        batch = []
+        for row in reader:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(insert_sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert_sql, batch)
 
     conn.commit()
     conn.close()
@@ -27,16 +88,17 @@ def csv_to_sqlite(csv_file, db_file="roster.db", table_name="roster"):
 def run_query(db_file="roster.db", query="SELECT * FROM roster LIMIT 5;"):
     conn = sqlite3.connect(db_file)
     cursor = conn.cursor()
-    
+
     cursor.execute(query)
-    rows = cursor.fetchall()
-    
-    # Print column names + data
-    col_names = [description[0] for description in cursor.description]
-    print("Columns:", col_names)
-    for row in rows:
-        print(row)
-    
+    cursor.arraysize = BATCH_SIZE
+
+    # Stream results in batches through csv.writer instead of printing
+    # row-by-row, which pays per-row repr + stdout overhead
+    writer = csv.writer(sys.stdout)
+    writer.writerow([description[0] for description in cursor.description])
+    while rows := cursor.fetchmany():
+        writer.writerows(rows)
+
     conn.close()
 
 if __name__ == "__main__":
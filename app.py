@@ -1,7 +1,10 @@
 # frontend/app.py
 import streamlit as st
 import pandas as pd
+import numpy as np
+import itertools
 import os
+import sqlite3
 import sys
 import plotly.express as px
 import plotly.graph_objects as go
@@ -117,6 +120,14 @@ st.markdown("""
 # ===============================
 # HELPER FUNCTIONS
 # ===============================
+# Arrow-backed strings are contiguous buffers and much cheaper to build
+# than Python str columns; fall back when pyarrow isn't installed
+try:
+    import pyarrow  # noqa: F401
+    CSV_STR_DTYPE = "string[pyarrow]"
+except ImportError:
+    CSV_STR_DTYPE = str
+
 def create_metric_card(title, value, delta=None):
     """Create a metric card component"""
     delta_html = f'<small style="color: #666;">+{delta}</small>' if delta else ""
@@ -128,6 +139,36 @@ def create_metric_card(title, value, delta=None):
     </div>
     """
 
+@st.cache_data
+def _activity_df():
+    """Static Recent Activity table, built once instead of per rerun"""
+    return pd.DataFrame({
+        'Time': ['10:30 AM', '10:15 AM', '09:45 AM', '09:30 AM'],
+        'Action': ['Data Validation', 'New Provider Added', 'License Renewed', 'Duplicate Removed'],
+        'Status': ['✅ Complete', '✅ Complete', '⚠️ Pending', '✅ Complete']
+    })
+
+@st.cache_data
+def to_csv_bytes(df):
+    """Serialize a DataFrame for download once per result set, not per rerun"""
+    return df.to_csv(index=False).encode("utf-8")
+
+@st.cache_resource
+def get_conn(db_path):
+    """One shared, read-tuned SQLite connection for every page"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.executescript(
+        "PRAGMA cache_size=-200000;"
+        "PRAGMA mmap_size=268435456;"
+        "PRAGMA temp_store=MEMORY;"
+    )
+    return conn
+
+@st.cache_resource
+def get_converter(db_path):
+    """Reuse one NL2SQL converter (and its SQLite connection) across reruns"""
+    return NL2SQLConverter(db_path, conn=get_conn(db_path))
+
 @st.cache_data
 def load_dedup_data():
     """Load deduplication data with caching"""
@@ -136,7 +177,9 @@ def load_dedup_data():
         if not os.path.exists(roster_file):
             return None, None, f"File not found: {roster_file}"
         
-        roster = pd.read_csv(roster_file, dtype=str).fillna("")
+        # na_filter=False skips the NaN scan and yields "" directly,
+        # so no .fillna("") pass is needed
+        roster = pd.read_csv(roster_file, dtype=CSV_STR_DTYPE, engine="c", na_filter=False)
         pairs_df, roster_out, clusters = dedupe(roster)
         return roster_out, clusters, None
     except Exception as e:
@@ -162,6 +205,9 @@ def load_validation_data():
     except Exception as e:
         return None, str(e)
 
+# cache_resource (not cache_data) because Plotly figures aren't hashable;
+# inputs are constant so the figures only need to be assembled once
+@st.cache_resource
 def create_dashboard_charts():
     """Create dashboard visualization charts"""
     # Sample data for demonstration
@@ -251,12 +297,7 @@ if "Dashboard" in page:
     
     # Recent activity
     st.markdown("### 📋 Recent Activity")
-    activity_data = {
-        'Time': ['10:30 AM', '10:15 AM', '09:45 AM', '09:30 AM'],
-        'Action': ['Data Validation', 'New Provider Added', 'License Renewed', 'Duplicate Removed'],
-        'Status': ['✅ Complete', '✅ Complete', '⚠️ Pending', '✅ Complete']
-    }
-    st.dataframe(pd.DataFrame(activity_data), use_container_width=True, hide_index=True)
+    st.dataframe(_activity_df(), use_container_width=True, hide_index=True)
 
 # ===============================
 # DEDUPLICATION PAGE
@@ -271,7 +312,24 @@ elif "Deduplication" in page:
             if error:
                 st.error(f"Error: {error}")
             else:
+                # Tuple for O(1) indexing; sizes computed once so the
+                # cluster picker doesn't re-count members per rerun
+                clusters = tuple(clusters)
                 st.session_state['dedup_results'] = (roster_out, clusters)
+                st.session_state['dedup_cluster_sizes'] = np.fromiter(
+                    (len(c) for c in clusters), dtype=np.int32, count=len(clusters)
+                )
+                # Count cluster sizes once; the metric cards reuse this on
+                # every rerun instead of re-scanning the column
+                st.session_state['dedup_vc'] = roster_out["dedup_cluster_id"].value_counts()
+                # One-time in-memory index so the search box queries SQLite
+                # instead of rescanning the DataFrame per keystroke
+                search_conn = sqlite3.connect(":memory:", check_same_thread=False)
+                roster_out.to_sql("dedup_results", search_conn, index=False)
+                search_conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_dedup_name ON dedup_results(full_name COLLATE NOCASE)"
+                )
+                st.session_state['dedup_search_conn'] = search_conn
                 st.success("Deduplication completed successfully!")
     
     # Display results if available
@@ -283,10 +341,11 @@ elif "Deduplication" in page:
         with col1:
             st.markdown(create_metric_card("Total Records", len(roster_out)), unsafe_allow_html=True)
         with col2:
-            unique_clusters = len(roster_out["dedup_cluster_id"].unique())
+            vc = st.session_state['dedup_vc']
+            unique_clusters = len(vc)
             st.markdown(create_metric_card("Unique Clusters", unique_clusters), unsafe_allow_html=True)
         with col3:
-            duplicate_clusters = sum(roster_out["dedup_cluster_id"].value_counts() > 1)
+            duplicate_clusters = int((vc > 1).sum())
             st.markdown(create_metric_card("Duplicate Clusters", duplicate_clusters), unsafe_allow_html=True)
         with col4:
             dedup_rate = round((1 - duplicate_clusters / len(roster_out)) * 100, 1)
@@ -299,16 +358,26 @@ elif "Deduplication" in page:
             st.markdown("### Results")
             search_term = st.text_input("🔍 Search providers:")
             
-            display_data = roster_out.copy()
+            # No .copy() here: filtering already yields a new frame and the
+            # unfiltered view is read-only, so cloning per rerun buys nothing
+            display_data = roster_out
             if search_term:
-                display_data = display_data[
-                    display_data['full_name'].str.contains(search_term, case=False, na=False)
-                ]
-            
+                search_conn = st.session_state.get('dedup_search_conn')
+                if search_conn is not None:
+                    display_data = pd.read_sql_query(
+                        "SELECT * FROM dedup_results WHERE full_name LIKE :q LIMIT 100",
+                        search_conn,
+                        params={"q": f"%{search_term}%"}
+                    )
+                else:
+                    display_data = roster_out[
+                        roster_out['full_name'].str.contains(search_term, case=False, na=False)
+                    ]
+
             st.dataframe(display_data.head(100), use_container_width=True, hide_index=True)
             
             # Download
-            csv = roster_out.to_csv(index=False).encode("utf-8")
+            csv = to_csv_bytes(roster_out)
             st.download_button(
                 "📥 Download Results",
                 data=csv,
@@ -318,12 +387,17 @@ elif "Deduplication" in page:
         
         with tab2:
             if clusters and len(clusters) > 0:
-                cluster_options = [f"Cluster {i+1} ({len(cluster)} records)" for i, cluster in enumerate(clusters)]
-                selected = st.selectbox("Select cluster:", cluster_options)
-                
-                if selected:
-                    cluster_idx = int(selected.split()[1]) - 1
-                    cluster_data = roster_out.loc[clusters[cluster_idx]]
+                sizes = st.session_state['dedup_cluster_sizes']
+                # Options are raw indices; format_func renders the label, so
+                # no string parsing is needed to recover the selection
+                selected = st.selectbox(
+                    "Select cluster:",
+                    range(len(clusters)),
+                    format_func=lambda i: f"Cluster {i+1} ({sizes[i]} records)"
+                )
+
+                if selected is not None:
+                    cluster_data = roster_out.loc[clusters[selected]]
                     st.dataframe(cluster_data, use_container_width=True, hide_index=True)
             else:
                 st.success("✅ No duplicate clusters found!")
@@ -448,9 +522,9 @@ elif "AI Assistant" in page:
         ("🎓 Certified", "Board certified doctors")
     ]
     
+    cols = itertools.cycle((col1, col2, col3))
     for i, (title, question) in enumerate(sample_questions):
-        col = [col1, col2, col3][i % 3]
-        with col:
+        with next(cols):
             if st.button(title, key=f"sample_{i}"):
                 st.session_state.current_query = question
                 st.rerun()
@@ -490,7 +564,7 @@ elif "AI Assistant" in page:
                     with st.expander(f"📊 Results ({len(result_df)} records)"):
                         st.dataframe(result_df.head(50), use_container_width=True, hide_index=True)
                         
-                        csv = result_df.to_csv(index=False).encode("utf-8")
+                        csv = to_csv_bytes(result_df)
                         st.download_button(
                             "📥 Download",
                             data=csv,
@@ -520,7 +594,7 @@ elif "AI Assistant" in page:
                 if not os.path.exists(db_path):
                     response = "ERROR: Database file 'roster.db' not found. Please ensure the database is properly set up."
                 else:
-                    converter = NL2SQLConverter(db_path)
+                    converter = get_converter(db_path)
                     result, sql_or_error = converter.execute_nl_query(prompt)
                     
                     if result is not None:
@@ -536,9 +610,7 @@ elif "AI Assistant" in page:
                             response = f"Result: {result}. SQL: {sql_or_error}"
                     else:
                         response = f"ERROR: {sql_or_error}"
-                    
-                    converter.close()
-            
+
             except Exception as e:
                 response = f"ERROR: System error - {str(e)}"
         
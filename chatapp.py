@@ -1,22 +1,50 @@
 # chatbot/chatapp.py
 import sqlite3
-import pandas as pd
+import csv
 import os
+import re
+from itertools import islice
 from queries import parse_query
 
+# Aggregate queries without GROUP BY return one scalar; skip DataFrame
+# construction for them entirely
+_AGG_RE = re.compile(r"^\s*SELECT\s+(COUNT|SUM|AVG|MIN|MAX)\(", re.I)
+
 class NL2SQLConverter:
-    def __init__(self, db_path: str, csv_path: str = None):
+    # Schema cache shared across instances, keyed by (db_path, mtime) so it
+    # invalidates whenever the database file is rebuilt
+    _SCHEMA_CACHE = {}
+
+    def __init__(self, db_path: str, csv_path: str = None, query_only: bool = True, conn=None):
         """
         Initialize the NL2SQL converter with a SQLite database path.
         If csv_path is provided, load CSV data into the roster table if it's empty.
+        query_only marks the connection read-only once any CSV load is done.
+        An already-tuned shared connection can be passed in via conn.
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        if conn is not None:
+            # Shared connection: the caller owns connect-time tuning
+            self.conn = conn
+        else:
+            # check_same_thread=False so a cached converter survives Streamlit reruns
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+
+            # Read-mostly workload: large page cache, memory-mapped I/O and
+            # in-memory temp tables instead of the durability-tuned defaults
+            self.conn.executescript(
+                "PRAGMA cache_size=-200000;"
+                "PRAGMA mmap_size=268435456;"
+                "PRAGMA temp_store=MEMORY;"
+            )
 
         if csv_path:
             self.ensure_roster_table(csv_path)
+        if query_only:
+            self.conn.execute("PRAGMA query_only=1")
 
         self.columns = self.get_table_columns()
+        self.cursor = self.conn.cursor()
 
     def ensure_roster_table(self, csv_path: str):
         """Create 'roster' table from CSV if it doesn't exist or is empty."""
@@ -26,8 +54,7 @@ class NL2SQLConverter:
 
         if not table_exists:
             print("⚠️ Roster table not found. Creating from CSV...")
-            df = pd.read_csv(csv_path, dtype=str).fillna("")
-            df.to_sql("roster", self.conn, if_exists="replace", index=False)
+            self._bulk_load_csv(csv_path)
             print("✅ Roster table created.")
         else:
             # Check if table is empty
@@ -35,21 +62,61 @@ class NL2SQLConverter:
             count = cursor.fetchone()[0]
             if count == 0:
                 print("⚠️ Roster table is empty. Loading from CSV...")
-                df = pd.read_csv(csv_path, dtype=str).fillna("")
-                df.to_sql("roster", self.conn, if_exists="replace", index=False)
+                self._bulk_load_csv(csv_path)
                 print("✅ Roster table populated from CSV.")
 
+    def _bulk_load_csv(self, csv_path: str, batch_size: int = 10_000):
+        """Stream the CSV into the roster table with batched executemany inserts."""
+        # Cold-start load only: relax durability so the bulk insert is one
+        # fast transaction instead of per-row commits
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("PRAGMA journal_mode=MEMORY")
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            col_defs = ", ".join(f'"{col}" TEXT' for col in header)
+            insert_sql = f"INSERT INTO roster VALUES ({', '.join('?' * len(header))})"
+            with self.conn:
+                self.conn.execute("DROP TABLE IF EXISTS roster")
+                self.conn.execute(f"CREATE TABLE roster ({col_defs})")
+                while batch := list(islice(reader, batch_size)):
+                    self.conn.executemany(insert_sql, batch)
+
     def get_table_columns(self):
+        try:
+            key = (self.db_path, os.path.getmtime(self.db_path))
+        except OSError:
+            key = None
+        if key in self._SCHEMA_CACHE:
+            return self._SCHEMA_CACHE[key]
         cursor = self.conn.cursor()
         cursor.execute("PRAGMA table_info(roster)")
-        return [col[1] for col in cursor.fetchall()]
+        columns = [col[1] for col in cursor.fetchall()]
+        if key is not None:
+            self._SCHEMA_CACHE[key] = columns
+        return columns
 
     def execute_nl_query(self, natural_language_query: str):
         sql_query = parse_query(natural_language_query)
         try:
-            df = pd.read_sql_query(sql_query, self.conn)
-            if df.shape == (1, 1):  # aggregate result (COUNT, AVG, etc.)
-                return df.iloc[0, 0], sql_query
+            cur = self.cursor
+            if _AGG_RE.match(sql_query) and "GROUP BY" not in sql_query.upper():
+                return cur.execute(sql_query).fetchone()[0], sql_query
+            cur.execute(sql_query)
+            cur.arraysize = 1000
+            rows = []
+            while batch := cur.fetchmany():
+                rows.extend(batch)
+            names = [d[0] for d in cur.description]
+            if len(rows) == 1 and len(names) == 1:  # aggregate result (COUNT, AVG, etc.)
+                return rows[0][0], sql_query
+            # Deferred import: pandas stays off the module-import path so the
+            # chat module loads fast when only scalar queries are run
+            import pandas as pd
+            # Build the DataFrame column-wise; pd.read_sql_query goes through
+            # a slower row-at-a-time path for the same result
+            cols = zip(*rows) if rows else ([] for _ in names)
+            df = pd.DataFrame(dict(zip(names, cols)))
             return df, sql_query
         except Exception as e:
             return None, f"Error executing query: {str(e)}"
@@ -60,6 +127,8 @@ class NL2SQLConverter:
 
 # ✅ Example usage (run chatbot standalone)
 if __name__ == "__main__":
+    import pandas as pd
+
     db_file = "roster.db"
     csv_file = os.path.join("data", "provider_roster_with_errors.csv")
 
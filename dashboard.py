@@ -1,27 +1,41 @@
+import csv
 import pandas as pd
 import logging
 from collections import defaultdict
 from datetime import datetime
 
+# Arrow-backed reads skip per-cell Python strings and speed up the
+# downstream .str kernels; plain pandas remains the fallback
+try:
+    import pyarrow  # noqa: F401
+    ARROW_READ_KW = {"engine": "pyarrow", "dtype_backend": "pyarrow"}
+except ImportError:
+    ARROW_READ_KW = {}
+
+# The pyarrow engine does not support chunksize, so chunked reads keep the
+# C engine with Arrow-backed dtypes
+CHUNK_READ_KW = {k: v for k, v in ARROW_READ_KW.items() if k != "engine"}
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
 class ProviderDataVerifier:
-    def __init__(self, roster_file, ca_ground_truth_file, ny_ground_truth_file):
+    def __init__(self, roster_file, ca_ground_truth_file, ny_ground_truth_file, chunksize=50_000):
         self.roster_file = roster_file
         self.ca_ground_truth_file = ca_ground_truth_file
         self.ny_ground_truth_file = ny_ground_truth_file
+        # Rows are independent, so the roster streams through verification in
+        # chunks of this size — memory stays flat however large the file is
+        self.chunksize = chunksize
 
         # Containers
-        self.roster_data = None
         self.ca_ground_truth = None
         self.ny_ground_truth = None
-        self.ca_index = {}
-        self.ny_index = {}
 
-        # Results
+        # Results — per-category lists of columnar frames, concatenated once
+        # in generate_reports instead of accumulating per-row dicts
         self.mismatches = defaultdict(list)
         self.matches = defaultdict(list)
         self.expired_licenses = []
@@ -54,67 +68,69 @@ class ProviderDataVerifier:
     # -------------------------------------------------------------------
     # Load Data
     # -------------------------------------------------------------------
+    @staticmethod
+    def _usecols(path, wanted):
+        """Intersect the file header with the wanted columns (the pyarrow
+        engine only accepts usecols as a list, not a callable)."""
+        with open(path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f))
+        return [c for c in header if c in wanted]
+
     def load_data(self):
         logger.info("Loading data...")
-        self.roster_data = pd.read_csv(self.roster_file)
-        self.ca_ground_truth = pd.read_csv(self.ca_ground_truth_file)
-        self.ny_ground_truth = pd.read_csv(self.ny_ground_truth_file)
-        self._create_indexes()
-        logger.info("Loaded roster: %d, CA: %d, NY: %d", len(self.roster_data), len(self.ca_ground_truth), len(self.ny_ground_truth))
-
-    def _create_indexes(self):
-        for _, row in self.ca_ground_truth.iterrows():
-            lic = str(row["license_number"]).strip()
-            if lic and lic != "nan":
-                self.ca_index[lic] = row.to_dict()
-
-        for _, row in self.ny_ground_truth.iterrows():
-            lic = str(row["license_number"]).strip()
-            if lic and lic != "nan":
-                self.ny_index[lic] = row.to_dict()
+        # Ground truths are small and get merged against every chunk, so they
+        # load whole — but only the columns verification actually compares;
+        # the roster itself is read lazily in verify_data
+        wanted = set(self.field_mappings.values()) | {"license_number", "board_certification", "board_certified"}
+        self.ca_ground_truth = pd.read_csv(
+            self.ca_ground_truth_file, usecols=self._usecols(self.ca_ground_truth_file, wanted), **ARROW_READ_KW
+        )
+        self.ny_ground_truth = pd.read_csv(
+            self.ny_ground_truth_file, usecols=self._usecols(self.ny_ground_truth_file, wanted), **ARROW_READ_KW
+        )
+        logger.info("Loaded CA: %d, NY: %d", len(self.ca_ground_truth), len(self.ny_ground_truth))
 
     def _normalize_value(self, v):
         if pd.isna(v) or v is None:
             return ""
         return " ".join(str(v).strip().split()).lower()
 
+    @staticmethod
+    def _normalize_series(s):
+        """Vectorized counterpart of _normalize_value for whole columns"""
+        return s.fillna("").astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+
     # -------------------------------------------------------------------
     # Checks
     # -------------------------------------------------------------------
-    def _check_license_expiration(self, expiration_date, pid, full_name, lic, state):
-        current_date = datetime.now().date()
-        if not expiration_date:
+    def _check_license_expirations(self, matched, state):
+        """Parse and bucket all matched expiration dates in one vectorized pass."""
+        today = pd.Timestamp(datetime.now().date())
+        exp = pd.to_datetime(matched["gt_expiration_date"], errors="coerce", format="mixed").dt.normalize()
+        parsed = exp.notna()
+        if not parsed.any():
             return
-        exp_date = None
-        for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"]:
-            try:
-                exp_date = datetime.strptime(str(expiration_date), fmt).date()
-                break
-            except ValueError:
-                continue
-        if not exp_date:
-            return
-        info = {
-            "provider_id": pid,
-            "full_name": full_name,
-            "license_number": lic,
+        info = pd.DataFrame({
+            "provider_id": matched["provider_id"],
+            "full_name": matched["full_name"],
+            "license_number": matched["_lic"],
             "state": state,
-            "expiration_date": expiration_date,
-            "current_date": current_date.strftime("%Y-%m-%d"),
-            "days_difference": (exp_date - current_date).days,
-        }
-        if exp_date < current_date:
-            self.expired_licenses.append(info)
-        else:
-            self.not_expired_licenses.append(info)
-
-    def _check_board_certification(self, roster_record, gt_record, pid, full_name, state):
-        roster_board = str(roster_record.get("board_certified", "")).lower()
-        roster_spec = self._normalize_value(roster_record.get("primary_specialty", ""))
+            "expiration_date": matched["gt_expiration_date"],
+            "current_date": today.strftime("%Y-%m-%d"),
+        })
+        days = (exp - today).dt.days
+        expired = parsed & (exp < today)
+        active = parsed & ~(exp < today)
+        if expired.any():
+            self.expired_licenses.append(info[expired].assign(days_difference=days[expired].astype(int)))
+        if active.any():
+            self.not_expired_licenses.append(info[active].assign(days_difference=days[active].astype(int)))
+
+    def _check_board_certification(self, pid, full_name, lic, state, roster_board, roster_spec, gt_cert):
         result = {
             "provider_id": pid,
             "full_name": full_name,
-            "license_number": roster_record.get("license_number", ""),
+            "license_number": lic,
             "state": state,
             "roster_board_certified": roster_board,
             "roster_specialty": roster_spec,
@@ -123,7 +139,6 @@ class ProviderDataVerifier:
             "certification_correct": False,
         }
         if state == "CA":
-            gt_cert = self._normalize_value(gt_record.get("board_certification", ""))
             result["ground_truth_value"] = gt_cert
             if roster_board in ["true", "1", "yes"]:
                 if roster_spec and gt_cert:
@@ -137,7 +152,6 @@ class ProviderDataVerifier:
             else:
                 result["match_status"] = "NOT_CERTIFIED_MATCH" if not gt_cert else "NOT_CERTIFIED_BUT_GT_HAS_CERT"
         elif state == "NY":
-            gt_cert = str(gt_record.get("board_certified", "")).lower()
             result["ground_truth_value"] = gt_cert
             if roster_board == gt_cert:
                 result["match_status"] = "DIRECT_MATCH"
@@ -146,54 +160,110 @@ class ProviderDataVerifier:
                 result["match_status"] = "DIRECT_MISMATCH"
         self.board_certification_results.append(result)
 
-    def _compare_fields(self, roster_record, gt_record, pid, full_name):
+    def _compare_fields(self, matched):
         for rf, gf in self.field_mappings.items():
-            if rf in roster_record and gf in gt_record:
-                rv = self._normalize_value(roster_record[rf])
-                gv = self._normalize_value(gt_record[gf])
-                info = {
-                    "provider_id": pid,
-                    "full_name": full_name,
-                    "license_number": roster_record.get("license_number", ""),
-                    "state": roster_record.get("practice_state", ""),
-                    "roster_value": roster_record.get(rf, ""),
-                    "ground_truth_value": gt_record.get(gf, ""),
-                    "field_name": rf,
-                }
-                if rv == gv and (rv or gv):
-                    self.matches[f"{rf}_match"].append(info)
-                elif rv != gv and (rv or gv):
-                    self.mismatches[f"{rf}_mismatch"].append(info)
+            gcol = f"gt_{gf}"
+            if rf not in matched.columns or gcol not in matched.columns:
+                continue
+            rv = self._normalize_series(matched[rf])
+            gv = self._normalize_series(matched[gcol])
+            nonempty = rv.ne("") | gv.ne("")
+            eq = rv.eq(gv)
+            info = pd.DataFrame({
+                "provider_id": matched["provider_id"],
+                "full_name": matched["full_name"],
+                "license_number": matched["license_number"],
+                "state": matched["practice_state"],
+                "roster_value": matched[rf],
+                "ground_truth_value": matched[gcol],
+                "field_name": rf,
+            })
+            self.matches[f"{rf}_match"].append(info[eq & nonempty])
+            self.mismatches[f"{rf}_mismatch"].append(info[~eq & nonempty])
+
+    def _record_not_found(self, rows):
+        self.mismatches["license_not_found"].append(
+            pd.DataFrame({
+                "provider_id": rows["provider_id"],
+                "full_name": rows["full_name"],
+                "license_number": rows["_lic"],
+                "state": rows["_state"],
+            })
+        )
 
     # -------------------------------------------------------------------
     # Verification
     # -------------------------------------------------------------------
     def verify_data(self):
-        for idx, r in self.roster_data.iterrows():
-            pid = r.get("provider_id", f"UNKNOWN_{idx}")
-            full_name = r.get("full_name", "Unknown")
-            lic = str(r.get("license_number", "")).strip()
-            state = str(r.get("practice_state", "")).strip().upper()
-            if not lic or lic == "nan":
+        # Prepare the per-state ground-truth frames once, then stream the
+        # roster through in chunks; each chunk appends to the accumulators
+        gts = {}
+        for st_code, gt in (("CA", self.ca_ground_truth), ("NY", self.ny_ground_truth)):
+            gt_lic = gt["license_number"].astype(str).str.strip()
+            gt = gt.assign(_lic=gt_lic)[gt_lic.ne("") & gt_lic.ne("nan")]
+            gts[st_code] = gt.drop_duplicates(subset="_lic", keep="last").add_prefix("gt_")
+
+        for chunk in pd.read_csv(self.roster_file, chunksize=self.chunksize, **CHUNK_READ_KW):
+            self._verify_chunk(chunk, gts)
+
+    def _verify_chunk(self, roster, gts):
+        lic = roster["license_number"].astype(str).str.strip()
+        state = roster["practice_state"].astype(str).str.strip().str.upper()
+        roster = roster.assign(_lic=lic, _state=state)[lic.ne("") & lic.ne("nan")]
+
+        # One merge per state replaces the per-row dict lookups; field
+        # comparisons then run as vectorized column ops on the matched rows
+        for st_code, gt in gts.items():
+            sub = roster[roster["_state"] == st_code]
+            if sub.empty:
+                continue
+            merged = sub.merge(gt, left_on="_lic", right_on="gt__lic", how="left", indicator=True)
+
+            not_found = merged["_merge"] == "left_only"
+            if not_found.any():
+                self._record_not_found(merged[not_found])
+
+            matched = merged[~not_found]
+            if matched.empty:
                 continue
-            gt = self.ca_index.get(lic) if state == "CA" else self.ny_index.get(lic) if state == "NY" else None
-            if gt:
-                self._compare_fields(r.to_dict(), gt, pid, full_name)
-                self._check_license_expiration(gt.get("expiration_date"), pid, full_name, lic, state)
-                self._check_board_certification(r.to_dict(), gt, pid, full_name, state)
+            self._compare_fields(matched)
+
+            # Normalize the board-certification columns once per state batch
+            # instead of calling _normalize_value inside the row loop
+            spec_norm = self._normalize_series(matched["primary_specialty"]).tolist()
+            if st_code == "CA":
+                cert_norm = self._normalize_series(matched["gt_board_certification"]).tolist()
             else:
-                self.mismatches["license_not_found"].append(
-                    {"provider_id": pid, "full_name": full_name, "license_number": lic, "state": state}
-                )
+                cert_norm = matched["gt_board_certified"].astype(str).str.lower().tolist()
+            board_norm = matched["board_certified"].astype(str).str.lower().tolist()
+
+            self._check_license_expirations(matched, st_code)
+
+            # Positional access over plain column lists — no per-row dict
+            # materialization of the merged frame
+            for pid, full_name, lic_raw, roster_board, roster_spec, gt_cert in zip(
+                matched["provider_id"].tolist(), matched["full_name"].tolist(),
+                matched["license_number"].tolist(), board_norm, spec_norm, cert_norm,
+            ):
+                self._check_board_certification(pid, full_name, lic_raw, st_code, roster_board, roster_spec, gt_cert)
+
+        # States outside CA/NY have no ground truth at all
+        other = roster[~roster["_state"].isin(["CA", "NY"])]
+        if not other.empty:
+            self._record_not_found(other)
 
     # -------------------------------------------------------------------
     # Reports (returns DataFrames instead of only saving)
     # -------------------------------------------------------------------
     def generate_reports(self):
-        mismatches_df = pd.DataFrame([m for cat in self.mismatches.values() for m in cat]) if self.mismatches else pd.DataFrame()
-        matches_df = pd.DataFrame([m for cat in self.matches.values() for m in cat]) if self.matches else pd.DataFrame()
-        expired_df = pd.DataFrame(self.expired_licenses) if self.expired_licenses else pd.DataFrame()
-        active_df = pd.DataFrame(self.not_expired_licenses) if self.not_expired_licenses else pd.DataFrame()
+        def _concat(frames):
+            frames = [f for f in frames if len(f)]
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+        mismatches_df = _concat([f for cat in self.mismatches.values() for f in cat])
+        matches_df = _concat([f for cat in self.matches.values() for f in cat])
+        expired_df = _concat(self.expired_licenses)
+        active_df = _concat(self.not_expired_licenses)
         board_df = pd.DataFrame(self.board_certification_results) if self.board_certification_results else pd.DataFrame()
 
         return {
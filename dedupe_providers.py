@@ -2,9 +2,12 @@
 # Local-only provider deduplication: blocking, similarity, scoring, clustering
 import os, re
 from collections import defaultdict, Counter
+import numpy as np
 import pandas as pd
-from difflib import SequenceMatcher
-from itertools import combinations
+from joblib import Parallel, delayed
+from rapidfuzz import fuzz
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 
 OUT_PATH = './dedup_results.csv'
 PAIRS_OUT = './dedup_candidate_pairs.csv'
@@ -12,20 +15,26 @@ PAIRS_OUT = './dedup_candidate_pairs.csv'
 # -------------------------
 # Helpers: normalization
 # -------------------------
+# Precompiled patterns: re.sub with a literal recompiles/caches per call, and
+# the punctuation pass folds into the non-alphanumeric one
+_HONORIFICS = re.compile(r'\b(?:dr|md|do|prof|mr|mrs|ms|jr|sr|ii|iii)\b')
+_NONALNUM = re.compile(r'[^a-z0-9\s]')
+_WS = re.compile(r'\s+')
+_NONDIGIT = re.compile(r'[^0-9]')
+
 def normalize_name(s: str) -> str:
     s = (s or '')
     s = s.lower().strip()
-    s = re.sub(r'[\.,]',' ', s)
-    s = re.sub(r'\b(dr|md|do|prof|mr|mrs|ms|jr|sr|ii|iii)\b', '', s)
-    s = re.sub(r'[^a-z0-9\s]', ' ', s)
-    s = re.sub(r'\s+', ' ', s).strip()
+    s = _HONORIFICS.sub('', s)
+    s = _NONALNUM.sub(' ', s)
+    s = _WS.sub(' ', s).strip()
     return s
 
 def normalize_phone(s: str) -> str:
-    return re.sub(r'[^0-9]', '', (s or ''))
+    return _NONDIGIT.sub('', (s or ''))
 
 def name_tokens(s: str):
-    return [t for t in re.split(r'\s+', s) if t]
+    return [t for t in _WS.split(s) if t]
 
 def last_name_prefix(s: str, n=4):
     toks = name_tokens(s)
@@ -36,7 +45,9 @@ def last_name_prefix(s: str, n=4):
 def seq_ratio(a: str, b: str) -> float:
     if not a and not b:
         return 1.0
-    return SequenceMatcher(None, a, b).ratio()
+    # rapidfuzz runs the edit-distance DP in C instead of difflib's
+    # pure-Python SequenceMatcher
+    return fuzz.ratio(a, b) / 100.0
 
 def token_overlap(a: str, b: str) -> float:
     sa = set(name_tokens(a)); sb = set(name_tokens(b))
@@ -47,17 +58,12 @@ def token_overlap(a: str, b: str) -> float:
 
 def phone_last4(s: str): return s[-4:] if len(s)>=4 else ''
 
-# -------------------------
-# Union-Find for clustering
-# -------------------------
-class UF:
-    def __init__(self, n): self.p = list(range(n))
-    def find(self,x):
-        if self.p[x]!=x: self.p[x]=self.find(self.p[x])
-        return self.p[x]
-    def union(self,a,b):
-        ra, rb = self.find(a), self.find(b)
-        if ra!=rb: self.p[rb]=ra
+def _score_chunk(name_a, name_b, addr_a, addr_b):
+    n = len(name_a)
+    name_sim = np.fromiter((seq_ratio(na, nb) for na, nb in zip(name_a, name_b)), dtype=np.float64, count=n)
+    tok_ov = np.fromiter((token_overlap(na, nb) for na, nb in zip(name_a, name_b)), dtype=np.float64, count=n)
+    addr_ov = np.fromiter((token_overlap(aa, ab) for aa, ab in zip(addr_a, addr_b)), dtype=np.float64, count=n)
+    return name_sim, tok_ov, addr_ov
 
 # -------------------------
 # Core dedupe function
@@ -68,83 +74,126 @@ def dedupe(roster_df, threshold_definite=5.0, threshold_possible=3.0, verbose=Tr
     roster['npi_norm'] = roster['npi'].astype(str).str.strip()
     roster['license_norm'] = roster['license_number'].astype(str).str.strip().str.upper()
     roster['license_state_norm'] = roster['license_state'].astype(str).str.strip().str.upper()
-    roster['phone_norm'] = roster['practice_phone'].astype(str).map(normalize_phone)
-    roster['phone_last4'] = roster['phone_norm'].map(phone_last4)
-    roster['last_pref'] = roster['name_norm'].map(lambda x: last_name_prefix(x,4))
+    roster['phone_norm'] = roster['practice_phone'].astype(str).str.replace(_NONDIGIT, '', regex=True)
+    roster['phone_last4'] = roster['phone_norm'].str.slice(-4).where(roster['phone_norm'].str.len() >= 4, '')
+    # name_norm already has collapsed whitespace, so the last \S+ run is the
+    # last name; .str slicing replaces the per-row map(lambda) calls
+    roster['last_pref'] = roster['name_norm'].str.extract(r'(\S+)\s*$', expand=False).str.slice(0, 4).fillna('')
     roster['tax_norm'] = roster['taxonomy_code'].astype(str).str.strip().str.upper().fillna('')
-    roster['addr_norm'] = (roster['practice_address_line1'].astype(str).fillna('')+' '+roster['practice_city'].astype(str).fillna('')+' '+roster['practice_state'].astype(str).fillna('')+' '+roster['practice_zip'].astype(str).fillna('')).map(lambda x: re.sub(r'[^a-z0-9\s]',' ', x.lower())).map(lambda x: re.sub(r'\s+',' ',x).strip())
+    roster['addr_norm'] = (roster['practice_address_line1'].astype(str).fillna('')+' '+roster['practice_city'].astype(str).fillna('')+' '+roster['practice_state'].astype(str).fillna('')+' '+roster['practice_zip'].astype(str).fillna('')) \
+        .str.lower().str.replace(_NONALNUM, ' ', regex=True).str.replace(_WS, ' ', regex=True).str.strip()
 
     idx = list(roster.index)
-    # Build blocks
-    blocks = defaultdict(list)
-    for i in idx:
-        r = roster.loc[i]
-        if r['npi_norm'] and r['npi_norm']!='nan': blocks['NPI::'+r['npi_norm']].append(i)
-        if r['license_norm'] and r['license_state_norm'] and r['license_norm']!='nan': blocks['LIC::'+r['license_state_norm']+'::'+r['license_norm']].append(i)
-        if r['last_pref']: blocks['LNP::'+r['last_pref']].append(i)
-        if r['phone_last4']: blocks['PH4::'+r['phone_last4']].append(i)
-        if r['tax_norm']: blocks['TAX::'+r['tax_norm']].append(i)
-
-    # Generate candidate pairs from blocks
-    candidates = set()
-    for k,v in blocks.items():
-        if len(v)>1:
-            for a,b in combinations(sorted(set(v)),2):
-                candidates.add((a,b))
-    if verbose: print(f"Generated {len(candidates)} candidate pairs from {len(blocks)} blocks")
-
-    # Score pairs
-    pair_data=[]
-    for a,b in candidates:
-        ra = roster.loc[a]; rb = roster.loc[b]
-        score = 0.0; reasons=[]
-        if ra['npi_norm'] and rb['npi_norm'] and ra['npi_norm']==rb['npi_norm']:
-            score += 6.0; reasons.append('npi_eq')
-        if ra['license_norm'] and rb['license_norm'] and ra['license_state_norm'] and rb['license_state_norm'] and ra['license_state_norm']==rb['license_state_norm'] and ra['license_norm']==rb['license_norm']:
-            score += 5.0; reasons.append('lic_eq')
-        name_sim = seq_ratio(ra['name_norm'], rb['name_norm']); score += name_sim * 3.0
-        tok_ov = token_overlap(ra['name_norm'], rb['name_norm']); score += tok_ov * 1.0
-        if ra['phone_last4'] and rb['phone_last4'] and ra['phone_last4']==rb['phone_last4']:
-            score += 1.5; reasons.append('ph4_eq')
-        addr_ov = token_overlap(ra['addr_norm'], rb['addr_norm']); score += addr_ov * 0.8
-        if ra['tax_norm'] and rb['tax_norm'] and ra['tax_norm']==rb['tax_norm']:
-            score += 0.6
-        if ra['npi_norm'] and rb['npi_norm'] and ra['npi_norm']!=rb['npi_norm'] and ra['npi_norm']!='nan' and rb['npi_norm']!='nan':
-            score -= 4.0; reasons.append('npi_conflict')
-        pair_data.append({'idx_a':a,'idx_b':b,'score':score,'name_sim':round(name_sim,3),'tok_ov':round(tok_ov,3),'addr_ov':round(addr_ov,3),'reasons':';'.join(reasons)})
-    pairs_df = pd.DataFrame(pair_data).sort_values('score', ascending=False).reset_index(drop=True)
+    index_to_pos = {idx[i]:i for i in range(len(idx))}
+
+    # Pull normalized columns out as arrays once; roster.loc allocates a
+    # Series per access, which dominates the blocking and scoring loops
+    npi_arr = roster['npi_norm'].to_numpy()
+    lic_arr = roster['license_norm'].to_numpy()
+    lic_state_arr = roster['license_state_norm'].to_numpy()
+    name_arr = roster['name_norm'].to_numpy()
+    addr_arr = roster['addr_norm'].to_numpy()
+    ph4_arr = roster['phone_last4'].to_numpy()
+    pref_arr = roster['last_pref'].to_numpy()
+    tax_arr = roster['tax_norm'].to_numpy()
+    pid_arr = roster['provider_id'].to_numpy()
+
+    # Per-record validity masks, computed once over N records instead of
+    # re-deriving the ''/'nan' sentinel comparisons per candidate pair
+    valid_npi = (npi_arr != '') & (npi_arr != 'nan')
+    valid_lic = (lic_arr != '') & (lic_arr != 'nan') & (lic_state_arr != '')
+    valid_ph4 = ph4_arr != ''
+    valid_tax = tax_arr != ''
+
+    # Candidate pair generation: a self-join per blocking key family runs in
+    # C instead of Python combinations per block
+    row_ids = np.arange(len(roster))
+    def _block_pairs(keys, mask):
+        df = pd.DataFrame({'key': keys[mask], 'row_id': row_ids[mask]})
+        m = df.merge(df, on='key')
+        return m.loc[m['row_id_x'] < m['row_id_y'], ['row_id_x','row_id_y']]
+
+    lic_key = (roster['license_state_norm'] + '::' + roster['license_norm']).to_numpy()
+    pair_frames = [
+        _block_pairs(npi_arr, valid_npi),
+        _block_pairs(lic_key, valid_lic),
+        _block_pairs(pref_arr, pref_arr != ''),
+        _block_pairs(ph4_arr, valid_ph4),
+        _block_pairs(tax_arr, valid_tax),
+    ]
+    cand = pd.concat(pair_frames, ignore_index=True).drop_duplicates()
+    A = cand['row_id_x'].to_numpy(); B = cand['row_id_y'].to_numpy()
+    if verbose: print(f"Generated {len(cand)} candidate pairs from {len(pair_frames)} blocking key families")
+
+    # Score pairs: equality contributions as vectorized boolean masks over
+    # the gathered pair columns; only the string-similarity kernels stay
+    # per-pair
+    # Factorize the compared columns to int codes once so the equality terms
+    # run as integer compares instead of per-pair string compares
+    npi_codes, _ = pd.factorize(npi_arr)
+    lic_codes, _ = pd.factorize(lic_arr)
+    lic_state_codes, _ = pd.factorize(lic_state_arr)
+    ph4_codes, _ = pd.factorize(ph4_arr)
+    tax_codes, _ = pd.factorize(tax_arr)
+
+    npi_present = (npi_arr[A]!='') & (npi_arr[B]!='')
+    npi_eq = npi_present & (npi_codes[A]==npi_codes[B])
+    npi_conflict = valid_npi[A] & valid_npi[B] & (npi_codes[A]!=npi_codes[B])
+    lic_eq = valid_lic[A] & valid_lic[B] & (lic_state_codes[A]==lic_state_codes[B]) & (lic_codes[A]==lic_codes[B])
+    ph4_eq = valid_ph4[A] & valid_ph4[B] & (ph4_codes[A]==ph4_codes[B])
+    tax_eq = valid_tax[A] & valid_tax[B] & (tax_codes[A]==tax_codes[B])
+
+    # The similarity kernels are embarrassingly parallel over pair chunks;
+    # threads are enough since rapidfuzz releases the GIL in its C scorer
+    n_pairs = len(A)
+    n_jobs = min(os.cpu_count() or 1, max(1, n_pairs // 2000))
+    chunks = np.array_split(np.arange(n_pairs), n_jobs)
+    parts = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(_score_chunk)(name_arr[A[c]], name_arr[B[c]], addr_arr[A[c]], addr_arr[B[c]]) for c in chunks
+    )
+    name_sim = np.concatenate([p[0] for p in parts])
+    tok_ov = np.concatenate([p[1] for p in parts])
+    addr_ov = np.concatenate([p[2] for p in parts])
+
+    score = (6.0*npi_eq + 5.0*lic_eq + 3.0*name_sim + 1.0*tok_ov
+             + 1.5*ph4_eq + 0.8*addr_ov + 0.6*tax_eq - 4.0*npi_conflict)
+    reasons = (np.where(npi_eq, 'npi_eq;', '').astype(object)
+               + np.where(lic_eq, 'lic_eq;', '').astype(object)
+               + np.where(ph4_eq, 'ph4_eq;', '').astype(object)
+               + np.where(npi_conflict, 'npi_conflict;', '').astype(object))
+
+    idx_arr = np.asarray(idx)
+    pairs_df = pd.DataFrame({
+        'idx_a': idx_arr[A], 'idx_b': idx_arr[B], 'score': score,
+        'name_sim': np.round(name_sim, 3), 'tok_ov': np.round(tok_ov, 3),
+        'addr_ov': np.round(addr_ov, 3),
+        'reasons': pd.Series(reasons).str.rstrip(';'),
+    }).sort_values('score', ascending=False).reset_index(drop=True)
     pairs_df['match_class'] = pairs_df['score'].apply(lambda s: 'definite' if s>=threshold_definite else ('possible' if s>=threshold_possible else 'nonmatch'))
 
-    # Cluster definite matches
-    index_to_pos = {idx[i]:i for i in range(len(idx))}
-    uf = UF(len(idx))
-    for _,row in pairs_df[pairs_df['match_class']=='definite'].iterrows():
-        a = index_to_pos[row['idx_a']]; b = index_to_pos[row['idx_b']]
-        uf.union(a,b)
+    # Cluster definite matches: C-level connected components over the
+    # definite-match edge list instead of a Python union-find
+    n = len(idx)
+    defn = pairs_df[pairs_df['match_class']=='definite']
+    if len(defn):
+        pa = defn['idx_a'].map(index_to_pos).to_numpy()
+        pb = defn['idx_b'].map(index_to_pos).to_numpy()
+        graph = coo_matrix((np.ones(len(defn)), (pa, pb)), shape=(n, n))
+        _, labels = connected_components(graph, directed=False)
+    else:
+        labels = np.arange(n)
     clusters = defaultdict(list)
-    for i in range(len(idx)):
-        clusters[uf.find(i)].append(idx[i])
-
-    # Build dedup mapping
-    record_to_cluster = {}
-    for root, members in clusters.items():
-        if len(members)==1:
-            record_to_cluster[members[0]] = roster.loc[members[0]]['provider_id']
-        else:
-            cand_ids = [roster.loc[m]['provider_id'] for m in members]
-            canonical = sorted(cand_ids)[0]
-            for m in members: record_to_cluster[m] = canonical
-    for i in idx:
-        if i not in record_to_cluster:
-            record_to_cluster[i] = roster.loc[i]['provider_id']
-
-    roster['dedup_cluster_id'] = roster.index.map(lambda x: record_to_cluster.get(x, roster.loc[x]['provider_id']))
+    for pos, lab in enumerate(labels):
+        clusters[lab].append(idx[pos])
+
+    # Canonical id = smallest provider_id within each component
+    roster['dedup_cluster_id'] = pd.Series(pid_arr, index=roster.index).groupby(labels).transform('min')
     roster.to_csv(OUT_PATH, index=False)
     pairs_df.to_csv(PAIRS_OUT, index=False)
 
     if verbose:
         n = len(roster_df)
-        n_clusters = len(set(record_to_cluster.values()))
+        n_clusters = roster['dedup_cluster_id'].nunique()
         counts = Counter(roster['dedup_cluster_id'])
         dup_counts = sum(1 for c in counts.values() if c>1)
         print(f"Wrote dedup results to {OUT_PATH}")
@@ -157,6 +206,12 @@ def dedupe(roster_df, threshold_definite=5.0, threshold_possible=3.0, verbose=Tr
 # -------------------------
 if __name__ == '__main__':
     roster_file = "provider_roster_with_errors.csv"
-    roster = pd.read_csv(roster_file, dtype=str).fillna('')
+    # dtype=str keeps ids verbatim (the pyarrow engine would infer ints and
+    # drop leading npi zeros); Arrow-backed columns still skip per-cell
+    # Python strings
+    try:
+        roster = pd.read_csv(roster_file, dtype=str, dtype_backend='pyarrow').fillna('')
+    except ImportError:
+        roster = pd.read_csv(roster_file, dtype=str).fillna('')
     pairs_df, roster_out, multi = dedupe(roster)
     print("Done. Candidate pairs saved to:", PAIRS_OUT)
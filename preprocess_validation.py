@@ -1,25 +1,45 @@
-import pandas as pd
-
-FILE = "roster_with_validations.csv"
-
-# Load the file (read everything as string to avoid dtype issues)
-df = pd.read_csv(FILE, dtype=str).fillna("")
-
-# Function to lowercase only text values
-def safe_lower(val):
-    if pd.isna(val):
-        return ""
-    val_str = str(val)
-    # If it's purely numeric, keep as-is
-    if val_str.replace(".", "", 1).isdigit():
-        return val_str
-    return val_str.lower().strip()
-
-# Apply to all columns
-for col in df.columns:
-    df[col] = df[col].map(safe_lower)
-
-# Overwrite the same file
-df.to_csv(FILE, index=False)
-
-# print(f"✅ Saved normalized file: {FILE}")
+import csv
+
+FILE = "roster_with_validations.csv"
+
+# Purely numeric values (at most one dot) are kept as-is
+NUM_RE = r"\d*\.?\d+|\d+\."
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+if pa is not None:
+    # Arrow path: C-level CSV parse and UTF-8 kernels, no Python str objects
+    with open(FILE, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+    tbl = pacsv.read_csv(
+        FILE,
+        convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in header}),
+    )
+    for i, name in enumerate(tbl.column_names):
+        col = pc.fill_null(tbl.column(i), "")
+        is_num = pc.match_substring_regex(col, f"^(?:{NUM_RE})$")
+        lowered = pc.utf8_trim_whitespace(pc.utf8_lower(col))
+        tbl = tbl.set_column(i, name, pc.if_else(is_num, col, lowered))
+    pacsv.write_csv(tbl, FILE)
+else:
+    import pandas as pd
+
+    # Load the file (read everything as string to avoid dtype issues)
+    df = pd.read_csv(FILE, dtype=str).fillna("")
+
+    # Lowercase only text values, column by column: a vectorized numeric mask
+    # replaces the per-cell safe_lower function
+    for col in df.columns:
+        s = df[col]
+        is_num = s.str.fullmatch(NUM_RE)
+        df[col] = s.where(is_num, s.str.lower().str.strip())
+
+    # Overwrite the same file
+    df.to_csv(FILE, index=False)
+
+# print(f"✅ Saved normalized file: {FILE}")
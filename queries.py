@@ -1,15 +1,120 @@
 # queries.py - Fixed Version with Exact Matching and Proper Conditional Logic
+import functools
 import re
-from sentence_transformers import SentenceTransformer, util
 from typing import Dict, List, Tuple, Optional
 
-# Load embedding model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Embedding model is loaded lazily: importing sentence_transformers pulls in
+# torch and the model weights, which most queries (dynamic parsing) never need
+_model = None
+
+def get_model():
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+        try:
+            # Dynamic int8 quantization roughly halves CPU inference cost
+            import torch
+            _model = torch.quantization.quantize_dynamic(_model, {torch.nn.Linear}, dtype=torch.qint8)
+        except Exception:
+            pass
+    return _model
 
 # ============================================================================
 # FIXED QUERY PARSER - EXACT MATCHING & CONDITIONAL STATE LOGIC
 # ============================================================================
 
+# Precompiled patterns: the parser runs per keystroke-ish in the dashboard, so
+# regexes compile once at import instead of round-tripping re's bounded cache
+# One alternation with a dispatch map normalizes both phrasings in a single
+# pass over the query
+_PREPROC_RE = re.compile(r'\bpracticing from\b|\bwith experience of\b')
+_PREPROC_MAP = {'practicing from': 'practicing for', 'with experience of': 'with'}
+_YEARS_STRIP_RE = re.compile(r'(?:practicing|with|having|experience).?(?:more than|less than|over|under|exactly|between).?\d+\s*years?')
+_CLEAN_CITY_RE = re.compile(r'\b(city|state|county|and|with|practicing)\b')
+
+_CITY_PATTERNS = tuple(re.compile(p) for p in (
+    r'\bin\s+city\s+named\s+([a-z\s]+?)(?:\s+and|\s*$)',
+    r'\bcity\s+named\s+([a-z\s]+?)(?:\s+and|\s*$)',
+    r'\bin\s+([a-z\s]+?)(?:\s+and|\s+practicing|\s+with|\s*$)',
+    r'\bfrom\s+([a-z\s]+?)(?:\s+and|\s+practicing|\s+with|\s*$)',
+    r'\blocated\s+in\s+([a-z\s]+?)(?:\s+and|\s*$)',
+))
+
+_STATE_PATTERNS = tuple(re.compile(p) for p in (
+    r'\bin\s+([a-z\s]+?)(?:\s+state)?\s+(?:and|with|$)',  # "in California", "in CA state"
+    r'\bstate\s+of\s+([a-z\s]+?)(?:\s+and|with|$)',      # "state of California"
+    r'\b([a-z]{2})\b',  # Two letter state codes
+))
+
+def _sql_str(value) -> str:
+    """Quote a value for inlining into SQL, doubling any embedded quotes.
+    Extracted values all come from the whitelist tables, but quoting in one
+    place keeps every clause template constant."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _keyword_scanner(mapping):
+    """Compile one alternation over every keyword so a single C-level scan
+    replaces the per-key Python substring loop. Longer keys come first so
+    multi-word entries win, and the lookaround guards enforce word boundaries
+    ("urologist" no longer fires inside "neurologists")."""
+    keys = sorted(mapping, key=len, reverse=True)
+    pattern = re.compile(r'(?<![a-z0-9])(?:' + '|'.join(map(re.escape, keys)) + r')(?![a-z0-9])')
+
+    def scan(text):
+        m = pattern.search(text)
+        return mapping[m.group(0)] if m else None
+
+    return scan
+
+
+_YEARS_PATTERNS = tuple((p, op, n) for p, op, n in (
+    # More than patterns
+    (r'more\s+than\s+(\d+)\s*years?', '>', 1),
+    (r'practicing\s+(?:from|for)\s+more\s+than\s+(\d+)\s*years?', '>', 1),
+    (r'with\s+more\s+than\s+(\d+)\s*years?', '>', 1),
+    (r'over\s+(\d+)\s*years?', '>', 1),
+    (r'greater\s+than\s+(\d+)\s*years?', '>', 1),
+    (r'above\s+(\d+)\s*years?', '>', 1),
+    (r'>\s*(\d+)\s*years?', '>', 1),
+
+    # Less than patterns
+    (r'less\s+than\s+(\d+)\s*years?', '<', 1),
+    (r'under\s+(\d+)\s*years?', '<', 1),
+    (r'below\s+(\d+)\s*years?', '<', 1),
+    (r'fewer\s+than\s+(\d+)\s*years?', '<', 1),
+    (r'<\s*(\d+)\s*years?', '<', 1),
+
+    # Exactly patterns
+    (r'exactly\s+(\d+)\s*years?', '=', 1),
+    (r'equal\s+to\s+(\d+)\s*years?', '=', 1),
+    (r'(\d+)\s*years?\s+exactly', '=', 1),
+    (r'=\s*(\d+)\s*years?', '=', 1),
+
+    # Between patterns
+    (r'between\s+(\d+)\s+and\s+(\d+)\s*years?', 'BETWEEN', 2),
+    (r'(\d+)\s*-\s*(\d+)\s*years?', 'BETWEEN', 2),
+))
+
+def _years_alternation(patterns):
+    """Fuse the years patterns into one named-group alternation: a single
+    scan replaces 17 sequential re.search calls, and the matched branch is
+    recovered from its group. Branch order keeps the original priority for
+    matches starting at the same position."""
+    branches = []
+    meta = []
+    for i, (p, op, n) in enumerate(patterns):
+        p = p.replace(r'(\d+)', fr'(?P<g{i}a>\d+)', 1)
+        if n == 2:
+            p = p.replace(r'(\d+)', fr'(?P<g{i}b>\d+)', 1)
+        branches.append(f'(?P<g{i}>{p})')
+        meta.append((op, n))
+    return re.compile('|'.join(branches)), tuple(meta)
+
+_YEARS_ALT_RE, _YEARS_META = _years_alternation(_YEARS_PATTERNS)
+
+
 class DynamicQueryParser:
     def __init__(self):
         self.specialties = {
@@ -47,65 +152,48 @@ class DynamicQueryParser:
             "chicago": "Chicago"
         }
 
+        # Single-scan keyword matchers built once per parser instance
+        self._find_specialty = _keyword_scanner(self.specialties)
+        self._find_city = _keyword_scanner(self.exact_cities)
+
     def preprocess_query(self, text: str) -> str:
         """Preprocess query to handle variations"""
-        # Normalize common variations
-        text = re.sub(r'\bpracticing from\b', 'practicing for', text)
-        text = re.sub(r'\bwith experience of\b', 'with', text)
-        return text
+        # Normalize common variations in one pass
+        return _PREPROC_RE.sub(lambda m: _PREPROC_MAP[m.group(0)], text)
 
-    def extract_city(self, text: str) -> Optional[str]:
+    def extract_city(self, text: str, text_without_years: str = None, text_lower: str = None) -> Optional[str]:
         """Extract city name from text - FIXED for exact matching"""
-        text_lower = text.lower()
-        
-        # Remove the years portion to avoid interference
-        years_pattern = r'(?:practicing|with|having|experience).?(?:more than|less than|over|under|exactly|between).?\d+\s*years?'
-        text_without_years = re.sub(years_pattern, '', text_lower)
-        
-        # More specific patterns for city extraction
-        city_patterns = [
-            r'\bin\s+city\s+named\s+([a-z\s]+?)(?:\s+and|\s*$)',
-            r'\bcity\s+named\s+([a-z\s]+?)(?:\s+and|\s*$)',
-            r'\bin\s+([a-z\s]+?)(?:\s+and|\s+practicing|\s+with|\s*$)',
-            r'\bfrom\s+([a-z\s]+?)(?:\s+and|\s+practicing|\s+with|\s*$)',
-            r'\blocated\s+in\s+([a-z\s]+?)(?:\s+and|\s*$)'
-        ]
-        
-        for pattern in city_patterns:
-            match = re.search(pattern, text_without_years)
+        if text_lower is None:
+            text_lower = text.lower()
+
+        # Remove the years portion to avoid interference (build_sql_query
+        # passes the already-stripped text so this runs once per query)
+        if text_without_years is None:
+            text_without_years = _YEARS_STRIP_RE.sub('', text_lower)
+
+        for pattern in _CITY_PATTERNS:
+            match = pattern.search(text_without_years)
             if match:
                 potential_city = match.group(1).strip()
                 # Clean up common words
-                potential_city = re.sub(r'\b(city|state|county|and|with|practicing)\b', '', potential_city).strip()
+                potential_city = _CLEAN_CITY_RE.sub('', potential_city).strip()
                 
                 # Check against exact known cities
                 if potential_city in self.exact_cities:
                     return self.exact_cities[potential_city]  # Return exact database spelling
         
-        # Fallback: Check if any known city is mentioned directly
-        for city_lower, city_exact in self.exact_cities.items():
-            if city_lower in text_lower:
-                return city_exact  # Return exact database spelling
-        
-        return None
+        # Fallback: one scan over the query for any known city
+        return self._find_city(text_lower)  # Exact database spelling or None
 
-    def extract_state(self, text: str) -> Optional[str]:
+    def extract_state(self, text: str, text_without_years: str = None) -> Optional[str]:
         """Extract state from text - ONLY if explicitly mentioned"""
-        text_lower = text.lower()
-        
         # Remove years portion first
-        years_pattern = r'(?:practicing|with|having|experience).?(?:more than|less than|over|under|exactly|between).?\d+\s*years?'
-        text_without_years = re.sub(years_pattern, '', text_lower)
-        
+        if text_without_years is None:
+            text_without_years = _YEARS_STRIP_RE.sub('', text.lower())
+
         # Only look for explicit state mentions
-        state_patterns = [
-            r'\bin\s+([a-z\s]+?)(?:\s+state)?\s+(?:and|with|$)',  # "in California", "in CA state"
-            r'\bstate\s+of\s+([a-z\s]+?)(?:\s+and|with|$)',      # "state of California"  
-            r'\b([a-z]{2})\b'  # Two letter state codes
-        ]
-        
-        for pattern in state_patterns:
-            matches = re.findall(pattern, text_without_years)
+        for pattern in _STATE_PATTERNS:
+            matches = pattern.findall(text_without_years)
             for match in matches:
                 match = match.strip()
                 if match in self.states:
@@ -113,62 +201,31 @@ class DynamicQueryParser:
         
         return None
 
-    def extract_specialty(self, text: str) -> Optional[str]:
+    def extract_specialty(self, text: str, text_lower: str = None) -> Optional[str]:
         """Extract medical specialty from text"""
-        text_lower = text.lower()
-        
-        for specialty_key, specialty_value in self.specialties.items():
-            if specialty_key in text_lower:
-                return specialty_value
-        return None
+        return self._find_specialty(text_lower if text_lower is not None else text.lower())
 
-    def extract_years_condition(self, text: str) -> Tuple[Optional[str], Optional[int]]:
+    def extract_years_condition(self, text: str, text_lower: str = None) -> Tuple[Optional[str], Optional[int]]:
         """Extract years in practice condition"""
-        text_lower = text.lower()
-        
-        # Comprehensive patterns for years
-        patterns = [
-            # More than patterns
-            (r'more\s+than\s+(\d+)\s*years?', '>', 1),
-            (r'practicing\s+(?:from|for)\s+more\s+than\s+(\d+)\s*years?', '>', 1),
-            (r'with\s+more\s+than\s+(\d+)\s*years?', '>', 1),
-            (r'over\s+(\d+)\s*years?', '>', 1),
-            (r'greater\s+than\s+(\d+)\s*years?', '>', 1),
-            (r'above\s+(\d+)\s*years?', '>', 1),
-            (r'>\s*(\d+)\s*years?', '>', 1),
-            
-            # Less than patterns
-            (r'less\s+than\s+(\d+)\s*years?', '<', 1),
-            (r'under\s+(\d+)\s*years?', '<', 1),
-            (r'below\s+(\d+)\s*years?', '<', 1),
-            (r'fewer\s+than\s+(\d+)\s*years?', '<', 1),
-            (r'<\s*(\d+)\s*years?', '<', 1),
-            
-            # Exactly patterns
-            (r'exactly\s+(\d+)\s*years?', '=', 1),
-            (r'equal\s+to\s+(\d+)\s*years?', '=', 1),
-            (r'(\d+)\s*years?\s+exactly', '=', 1),
-            (r'=\s*(\d+)\s*years?', '=', 1),
-            
-            # Between patterns
-            (r'between\s+(\d+)\s+and\s+(\d+)\s*years?', 'BETWEEN', 2),
-            (r'(\d+)\s*-\s*(\d+)\s*years?', 'BETWEEN', 2)
-        ]
-        
-        for pattern, operator, num_groups in patterns:
-            match = re.search(pattern, text_lower)
-            if match:
+        if text_lower is None:
+            text_lower = text.lower()
+
+        match = _YEARS_ALT_RE.search(text_lower)
+        if match:
+            for i, (operator, num_groups) in enumerate(_YEARS_META):
+                if match.group(f'g{i}') is None:
+                    continue
                 if num_groups == 1:
-                    return operator, int(match.group(1))
-                elif num_groups == 2:
-                    return f"BETWEEN {match.group(1)} AND {match.group(2)}", None
-        
+                    return operator, int(match.group(f'g{i}a'))
+                return f"BETWEEN {match.group(f'g{i}a')} AND {match.group(f'g{i}b')}", None
+
         return None, None
 
-    def detect_query_type(self, text: str) -> str:
+    def detect_query_type(self, text: str, text_lower: str = None) -> str:
         """Detect if it's a count or list query"""
-        text_lower = text.lower()
-        
+        if text_lower is None:
+            text_lower = text.lower()
+
         count_indicators = ['how many', 'count', 'number of', 'total', 'amount']
         
         for indicator in count_indicators:
@@ -177,10 +234,11 @@ class DynamicQueryParser:
         
         return 'list'
 
-    def extract_validation_context(self, text: str) -> Optional[str]:
+    def extract_validation_context(self, text: str, text_lower: str = None) -> Optional[str]:
         """Extract validation-related context"""
-        text_lower = text.lower()
-        
+        if text_lower is None:
+            text_lower = text.lower()
+
         if 'expired' in text_lower and 'license' in text_lower:
             return 'expired_licenses'
         elif 'validation' in text_lower or 'error' in text_lower:
@@ -205,36 +263,38 @@ class DynamicQueryParser:
         # Preprocess the query
         text = self.preprocess_query(text)
         
-        query_type = self.detect_query_type(text)
-        
-        # Extract all components
-        years_op, years_val = self.extract_years_condition(text)
-        city = self.extract_city(text)
-        state = self.extract_state(text)
-        specialty = self.extract_specialty(text)
-        validation_context = self.extract_validation_context(text)
+        # Lowercase once and strip the years clause once; every extractor
+        # shares these instead of rebuilding them
+        text_lower = text.lower()
+        text_without_years = _YEARS_STRIP_RE.sub('', text_lower)
+
+        query_type = self.detect_query_type(text, text_lower)
+        years_op, years_val = self.extract_years_condition(text, text_lower)
+        city = self.extract_city(text, text_without_years, text_lower)
+        state = self.extract_state(text, text_without_years)
+        specialty = self.extract_specialty(text, text_lower)
+        validation_context = self.extract_validation_context(text, text_lower)
         
         # Build conditions - ONLY add what's actually found
         conditions = []
         
         # FIXED: Use exact city name matching without LOWER()
         if city:
-            conditions.append(f"practice_city = '{city}'")
-        
+            conditions.append("practice_city = " + _sql_str(city))
+
         # FIXED: Only add state condition if actually found in query
         if state:
-            conditions.append(f"practice_state = '{state}'")
-            
+            conditions.append("practice_state = " + _sql_str(state))
+
         if specialty:
-            conditions.append(f"primary_specialty = '{specialty}'")
-            
+            conditions.append("primary_specialty = " + _sql_str(specialty))
+
         if years_op and years_val is not None:
-            conditions.append(f"years_in_practice {years_op} {years_val}")
+            conditions.append(f"years_in_practice {years_op} {int(years_val)}")
         elif years_op and 'BETWEEN' in years_op:
             conditions.append(f"years_in_practice {years_op}")
         
         # Handle board certification
-        text_lower = text.lower()
         if 'board certified' in text_lower or 'board-certified' in text_lower:
             if 'not board certified' in text_lower or 'not board-certified' in text_lower:
                 conditions.append("board_certified = 'False'")
@@ -298,8 +358,26 @@ SIMPLE_TEMPLATES = {
     "count cardiologists": "SELECT COUNT(*) as count FROM roster WHERE primary_specialty = 'Cardiology'",
 }
 
-# Create embeddings for simple templates
-template_embeddings = {k: model.encode(k, convert_to_tensor=True) for k in SIMPLE_TEMPLATES}
+# Cheap template routing: an exact lookup on the normalized query, then one
+# keyword scan for an embedded template phrase. Only a total miss pays for the
+# encoder forward pass below.
+def _normalize_template_key(text: str) -> str:
+    return ' '.join(re.sub(r'[^a-z0-9\s]', ' ', text.lower()).split())
+
+_TEMPLATE_LOOKUP = {_normalize_template_key(k): v for k, v in SIMPLE_TEMPLATES.items()}
+_TEMPLATE_SCAN = _keyword_scanner(_TEMPLATE_LOOKUP)
+
+# Embeddings for simple templates, computed on first fallback use as one
+# normalized batch instead of one encode call per template
+_template_embeddings = None
+
+def get_template_embeddings():
+    global _template_embeddings
+    if _template_embeddings is None:
+        keys = list(SIMPLE_TEMPLATES)
+        corpus = get_model().encode(keys, batch_size=64, convert_to_tensor=True, normalize_embeddings=True)
+        _template_embeddings = (keys, corpus)
+    return _template_embeddings
 
 # Create parser instance
 parser = DynamicQueryParser()
@@ -308,6 +386,9 @@ parser = DynamicQueryParser()
 # MAIN FUNCTION
 # ============================================================================
 
+# parse_query is deterministic (keyword tables are static), so repeat queries
+# — common in the dashboard — skip the whole regex/embedding pipeline
+@functools.lru_cache(maxsize=4096)
 def parse_query(natural_language_query: str) -> str:
     """
     Parse natural language query and return SQL.
@@ -331,15 +412,20 @@ def parse_query(natural_language_query: str) -> str:
         if "WHERE" in dynamic_sql:
             return dynamic_sql
         
-        # Fallback to template matching for very simple queries
-        query_embedding = model.encode(natural_language_query, convert_to_tensor=True)
-        
-        best_template = max(
-            template_embeddings.keys(),
-            key=lambda k: util.cos_sim(query_embedding, template_embeddings[k])
-        )
-        
-        return SIMPLE_TEMPLATES[best_template]
+        # Fallback to template matching for very simple queries: try the
+        # normalized lookup and phrase scan before waking the encoder
+        norm = _normalize_template_key(natural_language_query)
+        template_sql = _TEMPLATE_LOOKUP.get(norm) or _TEMPLATE_SCAN(norm)
+        if template_sql:
+            return template_sql
+
+        from sentence_transformers import util
+
+        query_embedding = get_model().encode(natural_language_query, convert_to_tensor=True, normalize_embeddings=True)
+        keys, corpus = get_template_embeddings()
+
+        hit = util.semantic_search(query_embedding, corpus, top_k=1)[0][0]
+        return SIMPLE_TEMPLATES[keys[hit["corpus_id"]]]
         
     except Exception as e:
         # Ultimate fallback
@@ -1,9 +1,16 @@
-import subprocess, sys
-
-# Step 1: run preprocessing
-subprocess.run([sys.executable, "dedupe_providers.py"], check=True)
-subprocess.run([sys.executable, "dashboard.py"], check=True)
-subprocess.run([sys.executable, "verification.py"], check=True)
-subprocess.run([sys.executable, "SQLite.py"], check=True)
-subprocess.run([sys.executable, "preprocess_validation.py"], check=True)
-subprocess.run(["streamlit", "run", "app.py"], check=True)
+import subprocess, sys
+
+# Step 1: dedupe, the verifier debug run and verification are independent
+# (different outputs), so they run concurrently — wall time is the slowest
+# stage instead of the sum
+stage1 = [subprocess.Popen([sys.executable, script])
+          for script in ("dedupe_providers.py", "dashboard.py", "verification.py")]
+for p in stage1:
+    if p.wait() != 0:
+        sys.exit(p.returncode)
+
+# Step 2: both touch roster_with_validations.csv — SQLite loads it before
+# preprocess_validation rewrites it in place, so these stay sequential
+subprocess.run([sys.executable, "SQLite.py"], check=True)
+subprocess.run([sys.executable, "preprocess_validation.py"], check=True)
+subprocess.run(["streamlit", "run", "app.py"], check=True)